@@ -1,6 +1,8 @@
 from flask import Flask, request, jsonify, g
+import click
 from flask_cors import CORS
 import os
+import threading
 import time
 import json
 import traceback
@@ -14,9 +16,14 @@ if str(current_dir) not in sys.path:
 
 from routes.api import api_bp
 from routes.kv import kv_bp
-from models import Base, engine
-from models.key_value import create_fts5_table, Key, Val, KVRelation
+from models import Base, engine, dispose_engines
+from models.key_value import create_fts5_table, outdated_fts_tables, rebuild_fts_index, optimize_fts_index, check_fts_index, FTS_INDEXES, create_kv_stats_table, migrate_val_store, compress_vals, sweep_blobs, rebuild_kv_stats, compact_kv_changes, run_write_transaction, Key, Val, KVRelation
+from config import CHANGE_LOG_MAX_ROWS, CHANGE_LOG_TOMBSTONE_RETENTION_DAYS
 from utils.logger import api_logger, error_logger
+from utils.deadline import register_deadline_hooks
+from utils.db import register_db_session
+from services.fts_maintenance import start_fts_maintenance
+from services.backup import create_backup, restore_backup, create_incremental_backup, restore_backup_chain, compact_backup_chain
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS for all routes
@@ -24,13 +31,57 @@ CORS(app)  # Enable CORS for all routes
 # Initialize database
 Base.metadata.create_all(bind=engine)
 
-# Create FTS5 virtual table
+# Deduplicate values of databases created by older builds
+migrate_val_store()
+
+# Create FTS5 virtual tables (indexing the values needs the migrated store)
 create_fts5_table()
 
+# Create trigger-maintained statistics table
+create_kv_stats_table()
+
+def compact_change_log():
+    """Apply the change log compaction policy"""
+    return run_write_transaction(
+        lambda db: compact_kv_changes(db, CHANGE_LOG_MAX_ROWS, CHANGE_LOG_TOMBSTONE_RETENTION_DAYS)
+    )
+
+# Bound the change log once per start
+compact_change_log()
+
+def sweep_blob_store(grace_seconds=None):
+    """Delete blob store files no value refers to any more"""
+    return run_write_transaction(lambda db: sweep_blobs(db, grace_seconds))
+
+# Drop blob files left behind by rolled-back writes or restores once per start
+sweep_blob_store()
+
+def rebuild_search_index(names=None, force=False):
+    """Rebuild the search tables under the current definition while searches keep working"""
+    indexed = rebuild_fts_index(names, force)
+    api_logger.info(f"[DEBUG_LOG] Search index rebuilt: {indexed}")
+    return indexed
+
+def start_background_services():
+    """
+    Start the search table maintenance and, when the search table definition
+    (e.g. FTS_PREFIX_INDEXES) changed, its rebuild in this process. Until the
+    rebuild finishes searches use the previous tables.
+    """
+    outdated = outdated_fts_tables()
+    if outdated:
+        threading.Thread(
+            target=rebuild_search_index, args=(outdated,), name='fts-rebuild', daemon=True
+        ).start()
+    start_fts_maintenance()
+
 # Register blueprints
 app.register_blueprint(api_bp, url_prefix='/api/v1')
 app.register_blueprint(kv_bp, url_prefix='/api/v1')
 
+# Request-scoped database sessions
+register_db_session(app)
+
 # Logging middleware
 @app.before_request
 def before_request():
@@ -78,11 +129,14 @@ def after_request(response):
             'response_time_ms': response_time_ms,
         }
 
-        # Try to parse response JSON
-        try:
-            response_data['response'] = json.loads(response.get_data(as_text=True))
-        except:
-            response_data['response'] = '[non-JSON response]'
+        # Try to parse response JSON (never buffer a streamed body such as the SSE feed)
+        if response.is_streamed:
+            response_data['response'] = '[streamed response]'
+        else:
+            try:
+                response_data['response'] = json.loads(response.get_data(as_text=True))
+            except:
+                response_data['response'] = '[non-JSON response]'
 
         api_logger.info(f"API Response: {json.dumps(response_data, default=str)}")
     except Exception as e:
@@ -90,6 +144,10 @@ def after_request(response):
 
     return response
 
+# Request deadlines; registered after the logging middleware so the 504
+# rewrite happens before the response is logged
+register_deadline_hooks(app)
+
 @app.errorhandler(Exception)
 def handle_exception(e):
     # Log the exception
@@ -131,5 +189,105 @@ def shutdown():
         error_logger.error(f"Error during shutdown: {str(e)}")
         return {"status": "error", "message": str(e)}, 500
 
+@app.cli.command('rebuild-stats')
+def rebuild_stats_command():
+    """Recompute the kv_stats table from the base tables"""
+    counters = run_write_transaction(rebuild_kv_stats)
+    print(f"kv_stats rebuilt: {counters}")
+
+@app.cli.command('compact-changes')
+def compact_changes_command():
+    """Apply the change log compaction policy now"""
+    print(f"kv_changes compacted: {compact_change_log()}")
+
+@app.cli.command('compress-values')
+def compress_values_command():
+    """Compress or move to the blob store the stored values that qualify but were written inline"""
+    after_id, total = 0, 0
+    while after_id is not None:
+        after_id, compressed = run_write_transaction(lambda db: compress_vals(db, after_id))
+        total += compressed
+    print(f"Values compressed: {total}")
+
+@app.cli.command('rebuild-search-index')
+def rebuild_search_index_command():
+    """Rebuild the full-text search tables online, e.g. after changing FTS_PREFIX_INDEXES"""
+    print(f"Search index rebuilt: {rebuild_search_index(force=True)}")
+
+@app.cli.command('optimize-search-index')
+def optimize_search_index_command():
+    """Merge every search table into a single segment now"""
+    for name in FTS_INDEXES:
+        run_write_transaction(lambda db: optimize_fts_index(db, name))
+    print(f"Search tables optimized: {', '.join(FTS_INDEXES)}")
+
+@app.cli.command('check-search-index')
+@click.option('--repair', is_flag=True, help='Index missing rows and rebuild tables with orphaned or stale rows')
+@click.option('--deep', is_flag=True, help='Also run the FTS5 integrity check (holds the write lock while it runs)')
+def check_search_index_command(repair, deep):
+    """Compare the full-text search tables with keys and vals while the server keeps running"""
+    def progress(name, last_id, found):
+        print(f"{name}: checked up to id {last_id}, {found['missing']} missing, "
+              f"{found['orphaned']} orphaned, {found['stale']} stale")
+
+    print(f"Search index check: {check_fts_index(repair=repair, deep=deep, progress=progress)}")
+
+@app.cli.command('sweep-blobs')
+@click.option('--grace', type=int, default=None, help='Keep unreferenced files younger than this many seconds')
+def sweep_blobs_command(grace):
+    """Delete blob store files no value refers to"""
+    print(f"Blob files removed: {sweep_blob_store(grace)}")
+
+@app.cli.command('backup')
+@click.option('--incremental', is_flag=True, help='Add a delta to the incremental backup chain instead')
+def backup_command(incremental):
+    """Write an online backup of the database to the backup directory"""
+    if incremental:
+        result = create_incremental_backup()
+        if result['type'] == 'none':
+            print("No changes since the last incremental backup")
+        else:
+            print(f"Incremental backup written: {result['name']} ({result['type']}, up to seq {result['to_seq']})")
+        return
+    backup = create_backup()
+    print(f"Backup written: {backup['name']} ({backup['pages']} pages, {backup['duration_ms']}ms)")
+    for name in backup['pruned']:
+        print(f"Removed old backup: {name}")
+
+@app.cli.command('restore')
+@click.argument('name')
+def restore_command(name):
+    """Replace the database contents with the named backup"""
+    result = restore_backup(name)
+    print(f"Backup {result['name']} restored in {result['duration_ms']}ms")
+
+@app.cli.command('restore-chain')
+def restore_chain_command():
+    """Replace the database contents with the end state of the incremental backup chain"""
+    result = restore_backup_chain()
+    print(f"Backup chain restored: base {result['name']} + {result['deltas']} deltas in {result['duration_ms']}ms")
+
+@app.cli.command('compact-backups')
+def compact_backups_command():
+    """Merge the deltas of the incremental backup chain into a new base"""
+    result = compact_backup_chain()
+    print(f"Backup chain compacted: {result['merged_deltas']} deltas merged into {result['base']}")
+
 if __name__ == '__main__':
-    app.run(debug=True, host='127.0.0.1', port=5000)
+    from server import serve, resolve_server_mode
+
+    def after_fork(slot):
+        # Forked workers must not reuse the supervisor's pooled connections
+        dispose_engines(close=False)
+        # One worker runs the background services for all of them; the
+        # supervisor starts no threads, so nothing is running when it forks
+        if slot == 0:
+            start_background_services()
+
+    mode = resolve_server_mode()
+    # The debug server's reloader runs this module twice, as the watching
+    # parent and as the serving child; only the child sets WERKZEUG_RUN_MAIN
+    if mode == 'threaded' or (mode == 'debug' and os.environ.get('WERKZEUG_RUN_MAIN') == 'true'):
+        start_background_services()
+    # Reconnect to the database on reload, e.g. after the file was replaced
+    serve(app, mode=mode, on_reload=dispose_engines, after_fork=after_fork)
@@ -0,0 +1,129 @@
+"""
+Benchmark: on-disk size and read latency with and without value compression.
+
+Loads the same synthetic data set (multi-KB JSON log batches plus short
+values) into two scratch databases, one with compression disabled and one
+with the configured threshold, then reports the database file size and the
+latency of reading keys' values through get_key_vals().
+
+Usage (from the backend directory):
+    python benchmarks/bench_compression.py [--keys 2000] [--reads 5000]
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add the backend directory to the Python path
+backend_dir = Path(__file__).resolve().parent.parent
+if str(backend_dir) not in sys.path:
+    sys.path.insert(0, str(backend_dir))
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from config import VAL_COMPRESSION_THRESHOLD
+from models import Base
+import models.key_value as key_value
+from models.key_value import create_kv_data, get_key_vals, create_fts5_table, create_kv_stats_table
+
+
+def make_values(rng, count):
+    """JSON log batches of 2-16 KB mixed with short values, like the production store"""
+    values = []
+    for i in range(count):
+        if i % 4 == 3:
+            values.append(f"https://example.com/items/{rng.randrange(10 ** 6)}")
+            continue
+        entries = [{
+            "ts": 1700000000 + rng.randrange(10 ** 6),
+            "level": rng.choice(["INFO", "WARN", "ERROR"]),
+            "path": f"/api/v1/kv/{rng.randrange(5000)}",
+            "status": rng.choice([200, 200, 200, 304, 404, 500]),
+            "duration_ms": round(rng.uniform(0.2, 250.0), 2)
+        } for _ in range(rng.randrange(20, 160))]
+        values.append(json.dumps(entries))
+    return values
+
+
+def load(db_path, values, threshold):
+    key_value.VAL_COMPRESSION_THRESHOLD = threshold
+    bench_engine = create_engine(f"sqlite:///{db_path}")
+    Base.metadata.create_all(bind=bench_engine)
+    create_fts5_table(bind=bench_engine)
+    create_kv_stats_table(bind=bench_engine)
+
+    db = sessionmaker(bind=bench_engine, autoflush=False)()
+    started = time.perf_counter()
+    key_ids = []
+    for i, value in enumerate(values):
+        key_ids.append(create_kv_data(db, f"bench_{i}", [value]).id)
+        if i % 500 == 499:
+            db.commit()
+    db.commit()
+    write_seconds = time.perf_counter() - started
+    db.close()
+
+    with bench_engine.connect() as conn:
+        conn.execute(text("VACUUM"))
+        vals_bytes = conn.execute(text("SELECT SUM(pgsize) FROM dbstat WHERE name = 'vals'")).scalar() \
+            if _has_dbstat(conn) else None
+    bench_engine.dispose()
+    return key_ids, write_seconds, vals_bytes
+
+
+def _has_dbstat(conn):
+    try:
+        conn.execute(text("SELECT 1 FROM dbstat LIMIT 1"))
+        return True
+    except Exception:
+        return False
+
+
+def read_latencies(db_path, key_ids, reads, rng):
+    bench_engine = create_engine(f"sqlite:///{db_path}")
+    db = sessionmaker(bind=bench_engine)()
+    samples = []
+    for key_id in (rng.choice(key_ids) for _ in range(reads)):
+        started = time.perf_counter()
+        get_key_vals(db, key_id)
+        samples.append((time.perf_counter() - started) * 1e6)
+    db.close()
+    bench_engine.dispose()
+    samples.sort()
+    return {
+        "mean": statistics.fmean(samples),
+        "p50": samples[len(samples) // 2],
+        "p95": samples[int(len(samples) * 0.95)]
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--keys', type=int, default=2000)
+    parser.add_argument('--reads', type=int, default=5000)
+    parser.add_argument('--threshold', type=int, default=VAL_COMPRESSION_THRESHOLD or 1024)
+    args = parser.parse_args()
+
+    values = make_values(random.Random(42), args.keys)
+    plain_bytes = sum(len(v.encode('utf-8')) for v in values)
+    print(f"{args.keys} values, {plain_bytes / 1024 / 1024:.1f} MiB of text, threshold {args.threshold} bytes\n")
+    print(f"{'mode':<12}{'file MiB':>10}{'vals MiB':>10}{'load s':>9}{'read mean us':>14}{'p50 us':>9}{'p95 us':>9}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for mode, threshold in (("plain", 0), ("compressed", args.threshold)):
+            db_path = os.path.join(tmp, f"{mode}.db")
+            key_ids, write_seconds, vals_bytes = load(db_path, values, threshold)
+            latency = read_latencies(db_path, key_ids, args.reads, random.Random(7))
+            vals_mib = f"{vals_bytes / 1024 / 1024:.1f}" if vals_bytes else "n/a"
+            print(f"{mode:<12}{os.path.getsize(db_path) / 1024 / 1024:>10.1f}{vals_mib:>10}"
+                  f"{write_seconds:>9.2f}{latency['mean']:>14.0f}{latency['p50']:>9.0f}{latency['p95']:>9.0f}")
+
+
+if __name__ == '__main__':
+    main()
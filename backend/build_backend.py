@@ -31,6 +31,8 @@ def build_backend():
             '--hidden-import=routes.kv',
             '--hidden-import=models',
             '--hidden-import=utils.logger',
+            '--hidden-import=server',
+            '--hidden-import=waitress',
             '--add-data=models/__init__.py;models',
             '--add-data=routes/__init__.py;routes',
             '--add-data=utils/__init__.py;utils',
@@ -44,6 +44,20 @@ else:
 SQLALCHEMY_DATABASE_URI = f'sqlite:///{SQLITE_DB_PATH}'
 SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+# Connection pool policy. GET routes use a read-only pool: in WAL mode any
+# number of connections can read concurrently while one writes, so it is
+# sized for the server threads (SERVER_THREADS) plus a little overflow for the
+# change stream. Writes use a small separate pool, since SQLite runs one write
+# transaction at a time. Checkouts beyond the limits wait up to DB_POOL_TIMEOUT
+# seconds.
+DB_POOL_SIZE = int(os.environ.get('KVS_DB_POOL_SIZE', 8))
+DB_POOL_MAX_OVERFLOW = int(os.environ.get('KVS_DB_POOL_MAX_OVERFLOW', 8))
+DB_WRITE_POOL_SIZE = int(os.environ.get('KVS_DB_WRITE_POOL_SIZE', 2))
+DB_WRITE_POOL_MAX_OVERFLOW = int(os.environ.get('KVS_DB_WRITE_POOL_MAX_OVERFLOW', 2))
+DB_POOL_TIMEOUT = 30
+DB_POOL_RECYCLE = 3600  # Seconds before a pooled connection is reopened
+DB_POOL_PRE_PING = True  # Detect connections broken by e.g. the database file being replaced
+
 # Application configuration
 DEBUG = True
 SECRET_KEY = 'dev-secret-key'  # Change this in production
@@ -66,3 +80,173 @@ ERROR_LOG_FILE = os.path.join(LOG_DIR, 'error.log')
 FRONTEND_LOG_FILE = os.path.join(LOG_DIR, 'frontend.log')
 LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 LOG_LEVEL = 'INFO'
+
+# Change feed configuration (Server-Sent Events)
+CHANGE_STREAM_POLL_SECONDS = 1.0  # Fallback poll interval, covers writes from other processes
+CHANGE_STREAM_HEARTBEAT_SECONDS = 15
+CHANGE_STREAM_BATCH_SIZE = 100
+CHANGE_STREAM_RETRY_MS = 3000  # Reconnect delay suggested to EventSource clients
+# Each subscriber occupies a server thread (SERVER_THREADS) for as long as it
+# stays connected; beyond this many per process new streams get 503
+CHANGE_STREAM_MAX_SUBSCRIBERS = int(os.environ.get('KVS_CHANGE_STREAM_MAX_SUBSCRIBERS', 2))
+
+# Change log compaction policy (used by /kv/sync)
+CHANGE_LOG_MAX_ROWS = 50000
+CHANGE_LOG_TOMBSTONE_RETENTION_DAYS = 30
+# Applied on start and, while the server runs, by the maintenance thread
+CHANGE_LOG_COMPACTION_INTERVAL_SECONDS = int(os.environ.get('KVS_CHANGE_LOG_COMPACTION_INTERVAL_SECONDS', 3600))
+SYNC_DEFAULT_LIMIT = 500
+SYNC_MAX_LIMIT = 5000
+
+# Single-flight request coalescing: identical concurrent requests to these
+# endpoints share one execution. Override with a comma-separated list.
+COALESCED_ENDPOINTS = set(filter(None, os.environ.get(
+    'KVS_COALESCED_ENDPOINTS', 'kv.search_kv,kv.cluster_keys').split(',')))
+
+# Admission control: each endpoint belongs to a priority class with its own
+# concurrency limit and bounded wait queue, so bulk work cannot take every
+# server thread away from interactive CRUD and search. Some endpoints have an
+# additional limit of their own. Queued requests hold a server thread too, so
+# keep bulk limit + queue_limit well below SERVER_THREADS.
+ADMISSION_CLASSES = {
+    'interactive': {'limit': 8, 'queue_limit': 32, 'queue_timeout': 10},
+    'bulk': {'limit': 2, 'queue_limit': 2, 'queue_timeout': 5},
+}
+ADMISSION_DEFAULT_CLASS = 'interactive'
+ADMISSION_ROUTE_CLASSES = {
+    'kv.export_kv_data': 'bulk',
+    'kv.import_kv_data': 'bulk',
+    'kv.cluster_keys': 'bulk',
+    'kv.create_kv_backup': 'bulk',
+    'kv.restore_kv_backup': 'bulk',
+    'kv.create_kv_incremental_backup': 'bulk',
+    'kv.compact_kv_backup_chain': 'bulk',
+    'kv.restore_kv_backup_chain': 'bulk',
+}
+ADMISSION_ROUTE_LIMITS = {
+    'kv.export_kv_data': {'limit': 1, 'queue_limit': 1, 'queue_timeout': 5},
+    'kv.import_kv_data': {'limit': 1, 'queue_limit': 0, 'queue_timeout': 0},
+    'kv.create_kv_backup': {'limit': 1, 'queue_limit': 0, 'queue_timeout': 0},
+    'kv.restore_kv_backup': {'limit': 1, 'queue_limit': 0, 'queue_timeout': 0},
+    'kv.restore_kv_backup_chain': {'limit': 1, 'queue_limit': 0, 'queue_timeout': 0},
+}
+ADMISSION_RETRY_AFTER_SECONDS = 2
+
+# Request deadlines: clients may send their remaining budget in milliseconds
+# in the deadline header or, to keep a cross-origin GET free of a CORS
+# preflight, the deadline query parameter; otherwise the route default
+# applies (None: no deadline, e.g. for the change stream). Running SQLite
+# statements are interrupted once the deadline passes, checked every
+# SQLITE_PROGRESS_HANDLER_OPS virtual machine instructions.
+REQUEST_DEADLINE_HEADER = 'X-Request-Deadline-Ms'
+REQUEST_DEADLINE_PARAM = 'deadline_ms'
+REQUEST_DEADLINE_DEFAULT_MS = 10000
+REQUEST_DEADLINE_MAX_MS = 300000
+REQUEST_DEADLINE_ROUTE_MS = {
+    'kv.stream_kv_changes': None,
+    'kv.export_kv_data': 60000,
+    'kv.import_kv_data': 120000,
+    'kv.cluster_keys': 30000,
+    'kv.create_kv_backup': None,
+    'kv.restore_kv_backup': None,
+    'kv.create_kv_incremental_backup': None,
+    'kv.compact_kv_backup_chain': None,
+    'kv.restore_kv_backup_chain': None,
+}
+SQLITE_PROGRESS_HANDLER_OPS = 1000
+
+# Single writer with group commit: write requests are executed by one writer
+# thread and committed together once WRITER_MAX_BATCH operations are queued or
+# WRITER_MAX_DELAY_MS has passed since the first one of the group.
+WRITER_MAX_BATCH = 64
+WRITER_MAX_DELAY_MS = 2
+
+# Lock contention: SQLite waits up to SQLITE_BUSY_TIMEOUT_MS for a competing
+# writer; if the database is still locked the whole write transaction is
+# retried up to WRITE_RETRY_ATTEMPTS times with jittered exponential backoff
+# (WRITE_RETRY_BASE_MS doubling per attempt, capped at WRITE_RETRY_MAX_MS).
+SQLITE_BUSY_TIMEOUT_MS = 5000
+WRITE_RETRY_ATTEMPTS = 5
+WRITE_RETRY_BASE_MS = 20
+WRITE_RETRY_MAX_MS = 1000
+
+# Value compression: values of at least VAL_COMPRESSION_THRESHOLD bytes are
+# stored zlib-compressed (level VAL_COMPRESSION_LEVEL) if that shrinks them to
+# at most VAL_COMPRESSION_MIN_RATIO of their size. 0 disables compression.
+VAL_COMPRESSION_THRESHOLD = int(os.environ.get('KVS_VAL_COMPRESSION_THRESHOLD', 1024))
+VAL_COMPRESSION_LEVEL = 6
+VAL_COMPRESSION_MIN_RATIO = 0.9
+
+# Blob store: values of at least VAL_BLOB_THRESHOLD bytes are kept out of
+# kvs.db, uncompressed in content-addressed files under BLOB_DIR, and list
+# endpoints return references to them. 0 keeps every value in the database.
+# Files are removed by a sweep, on start and every BLOB_SWEEP_INTERVAL_SECONDS
+# from the maintenance thread, once no value refers to them. Unreferenced
+# files younger than BLOB_SWEEP_GRACE_SECONDS survive a sweep, since they may
+# belong to a write that has not committed yet.
+BLOB_DIR = os.environ.get('KVS_BLOB_DIR', os.path.join(DATA_DIR, 'blobs'))
+VAL_BLOB_THRESHOLD = int(os.environ.get('KVS_VAL_BLOB_THRESHOLD', 1024 * 1024))
+BLOB_SWEEP_GRACE_SECONDS = 3600
+BLOB_SWEEP_INTERVAL_SECONDS = int(os.environ.get('KVS_BLOB_SWEEP_INTERVAL_SECONDS', 3600))
+BLOB_STREAM_CHUNK_SIZE = 64 * 1024
+
+# Full-text search: besides the terms, FTS5 indexes their prefixes of these
+# lengths (in characters), so the prefix queries of /kv/search ('q*') read one
+# index range instead of merging every matching term; 1 covers single
+# characters, CJK included. Changing the list makes the next start rebuild the
+# search tables in the background (or run `flask --app app rebuild-search-index`),
+# FTS_REBUILD_BATCH_SIZE rows per write transaction while searches keep using
+# the old tables.
+FTS_PREFIX_INDEXES = [int(n) for n in os.environ.get('KVS_FTS_PREFIX_INDEXES', '1,2,3').split(',') if n.strip()]
+FTS_REBUILD_BATCH_SIZE = 1000
+# Each write adds small segments to the search tables; FTS5 merges them
+# while writing once a level holds FTS_AUTOMERGE segments, and blocks the
+# write until merged at FTS_CRISISMERGE. The higher automerge default leaves
+# most merging to the maintenance thread, which checks the index every
+# FTS_MAINTENANCE_INTERVAL_SECONDS. Once nothing was written for
+# FTS_MAINTENANCE_IDLE_SECONDS and a table has FTS_MERGE_MIN_SEGMENTS segments
+# or more, it merges FTS_MERGE_PAGES pages per write transaction; after
+# FTS_OPTIMIZE_IDLE_SECONDS of quiet it optimizes the table into one segment.
+FTS_AUTOMERGE = int(os.environ.get('KVS_FTS_AUTOMERGE', 8))
+FTS_CRISISMERGE = int(os.environ.get('KVS_FTS_CRISISMERGE', 16))
+FTS_MAINTENANCE_INTERVAL_SECONDS = int(os.environ.get('KVS_FTS_MAINTENANCE_INTERVAL_SECONDS', 30))
+FTS_MAINTENANCE_IDLE_SECONDS = 30
+FTS_MERGE_MIN_SEGMENTS = 8
+FTS_MERGE_PAGES = 500
+FTS_OPTIMIZE_IDLE_SECONDS = 600
+
+# `flask --app app check-search-index` compares the search tables with keys and
+# vals FTS_CHECK_BATCH_SIZE ids per read transaction; missing index rows are
+# added batch by batch, tables with orphaned or stale rows are rebuilt online.
+FTS_CHECK_BATCH_SIZE = 1000
+
+# Online backups: kvs.db is copied page by page with the SQLite backup API,
+# BACKUP_PAGES_PER_STEP pages at a time with a BACKUP_STEP_SLEEP_MS pause in
+# between, into timestamped files under BACKUP_DIR. Only the newest
+# BACKUP_RETENTION backups are kept.
+BACKUP_DIR = os.environ.get('KVS_BACKUP_DIR', os.path.join(DATA_DIR, 'backups'))
+BACKUP_PAGES_PER_STEP = 1024
+BACKUP_STEP_SLEEP_MS = 5
+BACKUP_RETENTION = int(os.environ.get('KVS_BACKUP_RETENTION', 10))
+# Incremental backups add delta files to a chain; once it holds more than
+# BACKUP_CHAIN_MAX_DELTAS of them they are merged into a new base.
+BACKUP_CHAIN_MAX_DELTAS = 24
+
+# Server configuration
+# 'debug' runs the Werkzeug debug server and is only honoured in development
+# mode; 'threaded' runs the waitress production server; 'prefork' runs
+# SERVER_WORKERS threaded worker processes on one shared socket (POSIX only).
+SERVER_HOST = os.environ.get('KVS_HOST', '127.0.0.1')
+SERVER_PORT = int(os.environ.get('KVS_PORT', 5000))
+SERVER_MODE = os.environ.get('KVS_SERVER_MODE', 'debug' if is_development_mode() else 'threaded')
+SERVER_THREADS = int(os.environ.get('KVS_SERVER_THREADS', 8))  # Worker threads handling requests
+SERVER_BACKLOG = int(os.environ.get('KVS_SERVER_BACKLOG', 128))  # Pending connections queued by the OS
+SERVER_CONNECTION_LIMIT = int(os.environ.get('KVS_SERVER_CONNECTION_LIMIT', 100))
+SERVER_CHANNEL_TIMEOUT = int(os.environ.get('KVS_SERVER_CHANNEL_TIMEOUT', 120))  # Idle keep-alive timeout (seconds)
+SERVER_GRACEFUL_TIMEOUT = int(os.environ.get('KVS_SERVER_GRACEFUL_TIMEOUT', 30))  # Drain time on reload/stop (seconds)
+SERVER_WORKERS = int(os.environ.get('KVS_SERVER_WORKERS', os.cpu_count() or 2))  # Processes in prefork mode
+SERVER_RESTART_BACKOFF_MAX = 30  # Upper bound (seconds) on the delay before restarting a crashing worker
+
+# SQLite journal mode. WAL lets readers in any thread or process run alongside
+# the single writer; see docs/CONCURRENCY.md.
+SQLITE_JOURNAL_MODE = os.environ.get('KVS_SQLITE_JOURNAL_MODE', 'wal')